@@ -1,9 +1,15 @@
 import os
-from flask import Flask, request, jsonify
-from threading import Lock
-from collections import deque
+from array import array
+import orjson
+from flask import Flask, request
+from threading import Lock, local
+from collections import deque, OrderedDict
+from heapq import heappush, heappop
+from itertools import chain, islice
 
-from case_closed_game import Game, Direction, EMPTY, AGENT
+import numpy as np
+
+from case_closed_game import Game, Direction
 
 app = Flask(__name__)
 
@@ -11,99 +17,254 @@ GLOBAL_GAME = Game()
 LAST_POSTED_STATE = {}
 game_lock = Lock()
 
+# Bumped on every posted state; together with the player number it identifies the state a
+# /send-move poll answers, so re-polls of the same post hit the decision cache
+_post_generation = 0
+
+# Small LRU of decisions keyed by (post generation, player number); guarded by game_lock
+DECISION_CACHE_SIZE = 16
+_decision_cache = OrderedDict()
+
 PARTICIPANT = "ACPC_diddy_party_desuwa"
 AGENT_NAME = "Sneaky_Golem"
 
-# ---------------- Flood Fill Helper ----------------
-def flood_fill_space(pos, board, occupied):
+# Direction lookup tables, so hot paths skip Enum iteration and .value access
+_RIGHT, _LEFT, _UP, _DOWN = Direction.RIGHT, Direction.LEFT, Direction.UP, Direction.DOWN
+
+# Moves allowed from each heading (everything but reversing) as (direction, dx, dy), in Direction order
+_NONREVERSE = {
+    d: tuple((o, *o.value) for o in Direction if o.value != (-d.value[0], -d.value[1]))
+    for d in Direction
+}
+_ALL_MOVES = tuple((d, *d.value) for d in Direction)
+_VERTICAL_MOVES = ((_UP, 0, -1), (_DOWN, 0, 1))
+_FALLBACK_MOVES = ((_LEFT, -1, 0), (_RIGHT, 1, 0), (_UP, 0, -1), (_DOWN, 0, 1))
+
+# (start_y, w, h) -> (corridor_y, corridor row slice into the bitmap, row fill bytes)
+_CORRIDOR_CACHE = {}
+
+def _corridor(start_y, w, h):
+    """Return the cached sneaky corridor row for a start row and board size."""
+    key = (start_y, w, h)
+    corridor = _CORRIDOR_CACHE.get(key)
+    if corridor is None:
+        corridor_y = (start_y + h // 2) % h  # corridor on far side
+        corridor = (corridor_y, slice(corridor_y * w, (corridor_y + 1) * w), b"\x01" * w)
+        _CORRIDOR_CACHE[key] = corridor
+    return corridor
+
+# ---------------- Occupancy Bitmap ----------------
+def _rebuild_occ_bmap():
+    """
+    Rebuild GLOBAL_GAME._occ_bmap: a flat bytearray of length w*h (index y*w+x),
+    nonzero for every non-empty board cell and every known trail cell.
+    """
+    board = GLOBAL_GAME.board
     w, h = board.width, board.height
-    visited = set()
-    queue = deque([pos])
-    while queue:
-        x, y = queue.popleft()
-        if (x, y) in visited or (x, y) in occupied:
+    grid = board.grid  # always an int8 ndarray (see _update_local_game_from_post)
+    if grid.shape == (h, w):
+        bmap = bytearray(grid.tobytes())
+    else:
+        # Grid does not match the board size: fall back to trails only
+        bmap = bytearray(w * h)
+    for x, y in chain(GLOBAL_GAME.agent1.trail, GLOBAL_GAME.agent2.trail):
+        bmap[y * w + x] = 1
+    GLOBAL_GAME._occ_bmap = bmap
+
+def _update_occ_bmap(old_trails, board_posted):
+    """
+    Bring GLOBAL_GAME._occ_bmap up to date after a post. Trails only grow within a game,
+    so if both new trails extend the old ones just the new heads are set and a posted
+    grid is OR'd in; anything else (e.g. a new game) falls back to a full rebuild.
+    """
+    board = GLOBAL_GAME.board
+    w, h = board.width, board.height
+    new_trails = (GLOBAL_GAME.agent1.trail, GLOBAL_GAME.agent2.trail)
+    for old, new in zip(old_trails, new_trails):
+        k = len(old)
+        if not k or len(new) < k or new[0] != old[0] or new[k - 1] != old[-1]:
+            _rebuild_occ_bmap()
+            return
+    bmap = GLOBAL_GAME._occ_bmap
+    for old, new in zip(old_trails, new_trails):
+        for x, y in islice(reversed(new), len(new) - len(old)):
+            bmap[y * w + x] = 1
+    if board_posted and board.grid.shape == (h, w):
+        view = np.frombuffer(bmap, dtype=np.uint8)
+        np.bitwise_or(view, board.grid.view(np.uint8).ravel(), out=view)
+
+GLOBAL_GAME.board.grid = np.asarray(GLOBAL_GAME.board.grid, dtype=np.int8)
+_rebuild_occ_bmap()  # default game until the first state is posted
+
+# ---------------- Flood Fill Helper ----------------
+_scratch = local()  # per-thread reusable buffers (waitress serves on several threads)
+
+def _queue_buffer(n):
+    """Return this thread's int32 BFS queue of length n (contents are garbage), reused across calls."""
+    buf = getattr(_scratch, "queue", None)
+    if buf is None or len(buf) != n:
+        buf = _scratch.queue = array("i", bytes(4 * n))
+    return buf
+
+def compute_components(blocked: bytearray, w: int, h: int) -> tuple[list[int], list[int]]:
+    """
+    Label every free cell with its connected component in a single pass.
+    Returns (labels, sizes): labels[y*w+x] is the component id (0 = blocked)
+    and sizes[id] its cell count, with sizes[0] == 0.
+    BFS runs over a reused int32 queue of packed y*w+x ints.
+    """
+    n = w * h
+    labels = [0] * n
+    sizes = [0]
+    queue = _queue_buffer(n)
+    for start in range(n):
+        if blocked[start] or labels[start]:
             continue
-        visited.add((x, y))
-        for dx, dy in [d.value for d in Direction]:
-            nx, ny = (x + dx) % w, (y + dy) % h
-            if (nx, ny) not in visited and (nx, ny) not in occupied:
-                queue.append((nx, ny))
-    return len(visited)
+        label = len(sizes)
+        labels[start] = label
+        queue[0] = start
+        head, tail = 0, 1
+        while head < tail:
+            v = queue[head]
+            head += 1
+            x, y = v % w, v // w
+            row = y * w
+            for nb in (row + (x + 1) % w, row + (x - 1) % w,
+                       ((y + 1) % h) * w + x, ((y - 1) % h) * w + x):
+                if not blocked[nb] and not labels[nb]:
+                    labels[nb] = label
+                    queue[tail] = nb
+                    tail += 1
+        sizes.append(tail)  # every labelled cell was enqueued exactly once
+    return labels, sizes
+
+# Prefer the Numba-compiled kernels; fall back to the pure-Python versions above
+try:
+    from agent_numba import compute_components as fast_compute_components
+except ImportError:
+    fast_compute_components = compute_components
 
 # ---------------- BFS helper for post-corridor filling ----------------
-def bfs_next_move(head, occupied, board, preferred_dx):
+def bfs_next_move(head: tuple[int, int], bmap: bytearray, w: int, h: int, preferred_dx: int) -> Direction | None:
     """Return the next safe move in post-corridor fill (prefers horizontal)."""
-    w, h = board.width, board.height
     # First try to move horizontally in preferred direction
     nx, ny = (head[0] + preferred_dx) % w, head[1]
-    if not is_suicidal(head, (nx, ny), board, occupied):
-        return Direction.RIGHT if preferred_dx > 0 else Direction.LEFT
+    if not is_suicidal(bmap, w, nx, ny):
+        return _RIGHT if preferred_dx > 0 else _LEFT
     # Otherwise try vertical moves
-    for d in [Direction.UP, Direction.DOWN]:
-        nx, ny = (head[0] + d.value[0]) % w, (head[1] + d.value[1]) % h
-        if not is_suicidal(head, (nx, ny), board, occupied):
+    for d, dx, dy in _VERTICAL_MOVES:
+        nx, ny = (head[0] + dx) % w, (head[1] + dy) % h
+        if not is_suicidal(bmap, w, nx, ny):
             return d
     # fallback: pick any safe non-reversing move
-    for d in [Direction.LEFT, Direction.RIGHT, Direction.UP, Direction.DOWN]:
-        nx, ny = (head[0] + d.value[0]) % w, (head[1] + d.value[1]) % h
-        if not is_suicidal(head, (nx, ny), board, occupied):
+    for d, dx, dy in _FALLBACK_MOVES:
+        nx, ny = (head[0] + dx) % w, (head[1] + dy) % h
+        if not is_suicidal(bmap, w, nx, ny):
             return d
     return None
 
-# ---------------- Collision / suicide checker ----------------
-def is_suicidal(head, target, board, occupied_trails):
+# ---------------- A* helper for post-corridor filling ----------------
+def next_fill_goal(head: tuple[int, int], bmap: bytearray, w: int, h: int, preferred_dx: int) -> tuple[int, int] | None:
+    """Return the first free cell after head in a row-major sweep toward preferred_dx, or None."""
+    n = w * h
+    i = head[1] * w + head[0]
+    for _ in range(n - 1):
+        i = (i + preferred_dx) % n
+        if not bmap[i]:
+            return (i % w, i // w)
+    return None
+
+def astar_next(head: tuple[int, int], goal: tuple[int, int], bmap: bytearray, w: int, h: int,
+               max_expansions: int = 256) -> Direction | None:
     """
-    Return True if moving from head -> target would collide with a trail/wall.
-    Uses the board's authoritative cell state and explicit trail sets as a safety net.
+    Bounded A* from head to goal on the torus (Manhattan heuristic with wraparound).
+    Return the first move of the path, or None if goal isn't reached within max_expansions.
     """
-    tx, ty = target
-    # Check with board API (source of truth)
-    try:
-        cell_state = board.get_cell_state((tx, ty))
-    except Exception:
-        # Fallback if board.get_cell_state isn't available
-        cell_state = AGENT if (tx, ty) in occupied_trails else EMPTY
-
-    if cell_state != EMPTY:
-        return True
-
-    # Double-check against known trails (defensive)
-    if (tx, ty) in occupied_trails:
-        return True
+    hx, hy = head
+    gx, gy = goal
+    visited = bytearray(w * h)
+    visited[hy * w + hx] = 1
+    heap = []
+
+    def push(x: int, y: int, g: int, first: int) -> None:
+        dx, dy = abs(x - gx), abs(y - gy)
+        heappush(heap, (g + min(dx, w - dx) + min(dy, h - dy), g, x, y, first))
+
+    # Seed with the free neighbours; first is the index of the move in _ALL_MOVES
+    for first, (_, dx, dy) in enumerate(_ALL_MOVES):
+        nx, ny = (hx + dx) % w, (hy + dy) % h
+        if not bmap[ny * w + nx]:
+            push(nx, ny, 1, first)
+
+    expansions = 0
+    while heap and expansions < max_expansions:
+        _, g, x, y, first = heappop(heap)
+        i = y * w + x
+        if visited[i]:
+            continue
+        visited[i] = 1
+        if x == gx and y == gy:
+            return _ALL_MOVES[first][0]
+        expansions += 1
+        for _, dx, dy in _ALL_MOVES:
+            nx, ny = (x + dx) % w, (y + dy) % h
+            j = ny * w + nx
+            if not bmap[j] and not visited[j]:
+                push(nx, ny, g + 1, first)
+    return None
 
-    return False
+# ---------------- Collision / suicide checker ----------------
+def is_suicidal(bmap: bytearray, w: int, tx: int, ty: int) -> bool:
+    """
+    Return True if moving onto (tx, ty) would collide with a trail/wall.
+    bmap is the occupancy bitmap, which already merges the board state and the trails.
+    """
+    return bmap[ty * w + tx] != 0
 
 # ---------------- Suicide Move Selector ----------------
-def choose_non_suicidal_move(head, board, occupied_trails, candidate_moves, cur_dir):
+def choose_non_suicidal_move(candidate_moves: list, suicidal: dict) -> Direction | None:
     """
     candidate_moves: list of (space, direction, (nx,ny))
-    cur_dir: current direction tuple used to avoid reversing
+    suicidal: per-turn {direction: bool} for all four moves
     Return a chosen Direction object (guarantees non-suicidal if one exists).
     If none exist, return best candidate (most space) to match prior behavior.
     """
-    if not candidate_moves:
-        return None
-
-    # Sort by space descending (prefer larger reachable area)
-    candidate_moves.sort(reverse=True, key=lambda x: x[0])
-
-    # Try to pick first non-suicidal
-    for space, d, (nx, ny) in candidate_moves:
-        if not is_suicidal(head, (nx, ny), board, occupied_trails):
-            return d
+    # Single pass tracking the largest-space safe move and the largest-space move overall;
+    # strict > keeps the earliest candidate on ties
+    best_safe = best_any = None
+    safe_space = any_space = -1
+    for space, d, _ in candidate_moves:
+        if space > any_space:
+            best_any, any_space = d, space
+        if space > safe_space and not suicidal[d]:
+            best_safe, safe_space = d, space
 
     # no safe move -> return the best (most space) even if suicidal
-    return candidate_moves[0][1]
+    return best_safe if best_safe is not None else best_any
+
+# ---------------- Decision Cache ----------------
+def _remember_decision(key, chosen, start_state):
+    """
+    Store chosen with the (phase, escape_dx) it started from and the one it left behind,
+    evicting the oldest entry. Takes game_lock.
+    """
+    with game_lock:
+        _decision_cache[key] = (chosen, start_state, (send_move.phase, send_move.escape_dx))
+        if len(_decision_cache) > DECISION_CACHE_SIZE:
+            _decision_cache.popitem(last=False)
 
 # ---------------- Update Local Game ----------------
 def _update_local_game_from_post(data: dict):
+    global _post_generation
     with game_lock:
+        _post_generation += 1
         LAST_POSTED_STATE.clear()
         LAST_POSTED_STATE.update(data)
+        old_trails = (GLOBAL_GAME.agent1.trail, GLOBAL_GAME.agent2.trail)
         if "board" in data:
             try:
-                GLOBAL_GAME.board.grid = data["board"]
-            except Exception:
+                GLOBAL_GAME.board.grid = np.asarray(data["board"], dtype=np.int8)
+            except (TypeError, ValueError):
                 pass
         if "agent1_trail" in data:
             GLOBAL_GAME.agent1.trail = deque(tuple(p) for p in data["agent1_trail"])
@@ -123,6 +284,7 @@ def _update_local_game_from_post(data: dict):
             GLOBAL_GAME.agent2.boosts_remaining = int(data["agent2_boosts"])
         if "turn_count" in data:
             GLOBAL_GAME.turns = int(data["turn_count"])
+        _update_occ_bmap(old_trails, "board" in data)
 
 # ---------------- Send Move ----------------
 @app.route("/send-move", methods=["GET"])
@@ -136,41 +298,58 @@ def send_move():
     with game_lock:
         my_agent = GLOBAL_GAME.agent1 if player_number == 1 else GLOBAL_GAME.agent2
         opponent = GLOBAL_GAME.agent2 if player_number == 1 else GLOBAL_GAME.agent1
+        # Private copy: _update_occ_bmap edits the shared bitmap in place on every post
+        occ = bytearray(GLOBAL_GAME._occ_bmap)
+        head = my_agent.trail[-1]
+        opp_head = opponent.trail[-1] if opponent.alive else None
+        start_x, start_y = my_agent.trail[0]
+
+        # ---------------- Decision cache ----------------
+        # A re-poll of the same post returns the same move and leaves the same phase state,
+        # as long as the phase state is still the one that decision started from or left behind
+        cache_key = (_post_generation, player_number)
+        start_state = (send_move.phase, send_move.escape_dx)
+        cached = _decision_cache.get(cache_key)
+        if cached is not None and start_state in (cached[1], cached[2]):
+            _decision_cache.move_to_end(cache_key)
+            chosen, _, (send_move.phase, send_move.escape_dx) = cached
+            return _move_response(chosen)
 
-    head = my_agent.trail[-1]
-    opp_head = opponent.trail[-1] if opponent.alive else None
     w, h = GLOBAL_GAME.board.width, GLOBAL_GAME.board.height
-    start_x, start_y = my_agent.trail[0]
 
     # ---------------- Sneaky corridor ----------------
-    corridor_y = (start_y + h // 2) % h  # corridor on far side
-    sneaky_corridor = {(x % w, corridor_y) for x in range(w)}
+    corridor_y, corridor_row, corridor_fill = _corridor(start_y, w, h)
     exit_x = start_x  # horizontal exit toward original starting x
 
-    # Occupied according to trails (defensive)
-    occupied_trails = set(my_agent.trail) | set(opponent.trail)
-
     # ---------------- Safe moves ----------------
-    directions = [d for d in Direction]
-    cur_dx, cur_dy = my_agent.direction.value
-    directions = [d for d in directions if d.value != (-cur_dx, -cur_dy)]  # avoid reversing
+    directions = _NONREVERSE[my_agent.direction]  # avoid reversing
+
+    # Blocked mask (occupancy + sneaky corridor row) and component labels for this turn
+    blocked = bytearray(occ)
+    blocked[corridor_row] = corridor_fill
+    labels, sizes = fast_compute_components(blocked, w, h)
 
     move_options = []
-    for d in directions:
-        nx, ny = (head[0] + d.value[0]) % w, (head[1] + d.value[1]) % h
+    for d, dx, dy in directions:
+        nx, ny = (head[0] + dx) % w, (head[1] + dy) % h
         # We'll still compute space for candidate moves but we do not filter by occupied here;
         # the suicide check uses the authoritative board state.
         # However skip if this coord is obviously our immediate trail head duplicate
         # (avoid choosing current head again)
         if (nx, ny) == head:
             continue
-        space = flood_fill_space((nx, ny), GLOBAL_GAME.board, occupied_trails | sneaky_corridor)
+        space = sizes[labels[ny * w + nx]]
         move_options.append((space, d, (nx, ny)))
 
     # If no moves at all, keep current direction (will likely die, but nothing else to do)
     if not move_options:
         chosen = my_agent.direction
-        return jsonify({"move": chosen.name}), 200
+        _remember_decision(cache_key, chosen, start_state)
+        return _move_response(chosen)
+
+    # Suicide check for all four moves, done once per turn
+    hx, hy = head
+    suicidal = {d: occ[((hy + dy) % h) * w + (hx + dx) % w] != 0 for d, dx, dy in _ALL_MOVES}
 
     # ---------------- Phase transitions ----------------
     # Use BFS-ish metric? for now use BFS distance or x separation threshold depending on what you prefer;
@@ -195,79 +374,102 @@ def send_move():
 
     # ---------------- Decide move by phase (using non-suicidal chooser) ----------------
     if send_move.phase == "floodfill":
-        chosen = choose_non_suicidal_move(head, GLOBAL_GAME.board, occupied_trails, move_options, my_agent.direction)
+        chosen = choose_non_suicidal_move(move_options, suicidal)
 
     elif send_move.phase == "panic":
         # Step 1: Move vertically toward corridor_y if not aligned
         if head[1] != corridor_y:
-            tentative = Direction.DOWN if (head[1] < corridor_y) else Direction.UP
+            tentative = _DOWN if (head[1] < corridor_y) else _UP
         else:
             # Step 2: Move horizontally toward exit_x
             if head[0] != exit_x:
-                tentative = Direction.RIGHT if head[0] < exit_x else Direction.LEFT
+                tentative = _RIGHT if head[0] < exit_x else _LEFT
                 send_move.escape_dx = 1 if head[0] < exit_x else -1
             else:
                 # Step 3: Arrived at corridor exit
                 send_move.phase = "post_corridor_fill"
                 tentative = None
 
-        # If tentative exists, ensure it's not suicidal by checking board
+        # If tentative exists, ensure it's not suicidal
         if tentative is not None:
-            nx, ny = (head[0] + tentative.value[0]) % w, (head[1] + tentative.value[1]) % h
-            if not is_suicidal(head, (nx, ny), GLOBAL_GAME.board, occupied_trails):
+            if not suicidal[tentative]:
                 chosen = tentative
             else:
                 # fallback to non-suicidal candidate
-                chosen = choose_non_suicidal_move(head, GLOBAL_GAME.board, occupied_trails, move_options, my_agent.direction)
+                chosen = choose_non_suicidal_move(move_options, suicidal)
         else:
-            chosen = choose_non_suicidal_move(head, GLOBAL_GAME.board, occupied_trails, move_options, my_agent.direction)
+            chosen = choose_non_suicidal_move(move_options, suicidal)
 
     elif send_move.phase == "post_corridor_fill":
-        next_move = bfs_next_move(head, occupied_trails, GLOBAL_GAME.board, send_move.escape_dx or 1)
+        # A* toward the next free cell of the sweep, greedy picker if that fails;
+        # both only return moves onto free cells
+        preferred_dx = send_move.escape_dx or 1
+        goal = next_fill_goal(head, occ, w, h, preferred_dx)
+        next_move = astar_next(head, goal, occ, w, h) if goal is not None else None
+        if next_move is None:
+            next_move = bfs_next_move(head, occ, w, h, preferred_dx)
         if next_move is not None:
-            nx, ny = (head[0] + next_move.value[0]) % w, (head[1] + next_move.value[1]) % h
-            # double-check against authoritative board
-            if not is_suicidal(head, (nx, ny), GLOBAL_GAME.board, occupied_trails):
-                chosen = next_move
-            else:
-                chosen = choose_non_suicidal_move(head, GLOBAL_GAME.board, occupied_trails, move_options, my_agent.direction)
+            chosen = next_move
         else:
-            chosen = choose_non_suicidal_move(head, GLOBAL_GAME.board, occupied_trails, move_options, my_agent.direction)
+            chosen = choose_non_suicidal_move(move_options, suicidal)
 
     # Final guard: if chosen somehow None, pick best candidate
     if chosen is None:
         chosen = move_options[0][1]
 
-    return jsonify({"move": chosen.name}), 200
+    _remember_decision(cache_key, chosen, start_state)
+    return _move_response(chosen)
+
+# ---------------- JSON helpers ----------------
+def _read_json():
+    """Parse the request body with orjson; None if it is empty or not valid JSON."""
+    try:
+        return orjson.loads(request.get_data())
+    except orjson.JSONDecodeError:
+        return None
+
+def _json_response(obj, status=200):
+    """orjson-encoded equivalent of `jsonify(obj), status`."""
+    return app.response_class(orjson.dumps(obj), status=status, mimetype="application/json")
+
+# /send-move bodies are fixed per direction, so encode them once
+_MOVE_BODIES = {d: orjson.dumps({"move": d.name}) for d in Direction}
+
+def _move_response(chosen):
+    """Response for /send-move from the pre-encoded body (no JSON encoding per request)."""
+    return app.response_class(_MOVE_BODIES[chosen], mimetype="application/json")
 
 # ---------------- Boilerplate ----------------
 @app.route("/", methods=["GET"])
 def info():
-    return jsonify({"participant": PARTICIPANT, "agent_name": AGENT_NAME}), 200
+    return _json_response({"participant": PARTICIPANT, "agent_name": AGENT_NAME})
 
 @app.route("/send-state", methods=["POST"])
 def receive_state():
-    data = request.get_json()
+    data = _read_json()
     if not data:
-        return jsonify({"error": "no json body"}), 400
+        return _json_response({"error": "no json body"}, 400)
     _update_local_game_from_post(data)
-    return jsonify({"status": "state received"}), 200
+    return _json_response({"status": "state received"})
 
 @app.route("/end", methods=["POST"])
 def end_game():
-    data = request.get_json()
+    data = _read_json()
     if data:
         _update_local_game_from_post(data)
 
     # Reset for next game
     send_move.phase = "floodfill"
     send_move.escape_dx = 0
+    with game_lock:
+        _decision_cache.clear()
 
-    return jsonify({"status": "acknowledged"}), 200
+    return _json_response({"status": "acknowledged"})
 
 # ---------------- Main ----------------
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", "5008"))
     print(f"Starting {AGENT_NAME} ({PARTICIPANT}) on port {port}...")
-    # disable reloader to avoid duplicate processes binding same port
-    app.run(host="0.0.0.0", port=port, debug=False, use_reloader=False)
+    # production WSGI server instead of Werkzeug's dev server; game_lock guards shared state
+    from waitress import serve
+    serve(app, host="0.0.0.0", port=port, threads=2)
@@ -0,0 +1,90 @@
+from threading import local
+
+import numpy as np
+from numba import njit
+
+# ---------------- Numba Flood Fill ----------------
+@njit(cache=True, boundscheck=False)
+def _fill(blocked, marks, mark, sx, sy, queue):
+    """
+    BFS from (sx, sy) writing mark into every reachable free, unmarked cell.
+    queue is a preallocated int32 ring buffer of packed y*w+x ints.
+    Returns the number of cells marked.
+    """
+    h, w = blocked.shape
+    marks[sy, sx] = mark
+    queue[0] = sy * w + sx
+    head = 0
+    tail = 1
+    while head < tail:
+        v = queue[head]
+        head += 1
+        x = v % w
+        y = v // w
+        # Unrolled neighbours with torus wrap
+        nx = x + 1 if x < w - 1 else 0
+        if not blocked[y, nx] and not marks[y, nx]:
+            marks[y, nx] = mark
+            queue[tail] = y * w + nx
+            tail += 1
+        nx = x - 1 if x > 0 else w - 1
+        if not blocked[y, nx] and not marks[y, nx]:
+            marks[y, nx] = mark
+            queue[tail] = y * w + nx
+            tail += 1
+        ny = y + 1 if y < h - 1 else 0
+        if not blocked[ny, x] and not marks[ny, x]:
+            marks[ny, x] = mark
+            queue[tail] = ny * w + x
+            tail += 1
+        ny = y - 1 if y > 0 else h - 1
+        if not blocked[ny, x] and not marks[ny, x]:
+            marks[ny, x] = mark
+            queue[tail] = ny * w + x
+            tail += 1
+    return tail
+
+@njit(cache=True, boundscheck=False)
+def compute_components_nb(blocked, labels, sizes, queue):
+    """
+    Label every free cell with its connected component id (1..n; 0 = blocked).
+    labels/sizes/queue: caller-owned scratch of shape (h, w), (w*h+1,) and (w*h,).
+    Returns (labels, sizes[:n]) with sizes[0] == 0.
+    """
+    h, w = blocked.shape
+    labels[:] = 0
+    sizes[0] = 0
+    n = 1
+    for y in range(h):
+        for x in range(w):
+            if not blocked[y, x] and not labels[y, x]:
+                sizes[n] = _fill(blocked, labels, n, x, y, queue)
+                n += 1
+    return labels, sizes[:n]
+
+# ---------------- Scratch Buffers ----------------
+_scratch = local()  # per-thread (waitress serves on several threads)
+
+def _buffers(w, h):
+    """Return this thread's (labels, sizes, queue) int32 scratch for a w x h board, reused across calls."""
+    bufs = getattr(_scratch, "bufs", None)
+    if bufs is None or bufs[0].shape != (h, w):
+        bufs = _scratch.bufs = (
+            np.zeros((h, w), dtype=np.int32),
+            np.zeros(w * h + 1, dtype=np.int32),
+            np.empty(w * h, dtype=np.int32),
+        )
+    return bufs
+
+def compute_components(blocked, w, h):
+    """
+    Same signature as agent.compute_components; labels are returned flat (index y*w+x).
+    The result views this thread's scratch buffers, so it is only valid until the next call.
+    """
+    grid = np.frombuffer(blocked, dtype=np.int8).reshape(h, w)
+    labels, sizes, queue = _buffers(w, h)
+    labels, sizes = compute_components_nb(grid, labels, sizes, queue)
+    return labels.ravel(), sizes
+
+# Warm-compile at import so the first turn doesn't pay the JIT cost
+compute_components(bytearray(1), 1, 1)
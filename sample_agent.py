@@ -1,4 +1,5 @@
 import os
+import json
 from flask import Flask, request, jsonify
 from threading import Lock
 from collections import deque
@@ -14,6 +15,15 @@ game_lock = Lock()
 PARTICIPANT = "ParticipantX"
 AGENT_NAME = "TrumpAgent"
 
+# Direction offsets, hoisted out of the flood fill loop
+_DIRS = tuple(d.value for d in Direction)
+
+# /send-move bodies for every (direction, boost) pair, encoded once
+_MOVE_BODIES = {
+    (d, boost): json.dumps({"move": f"{d.name}:BOOST" if boost else d.name}).encode()
+    for d in Direction for boost in (False, True)
+}
+
 # ---------------- Flood Fill Helper ----------------
 def flood_fill_space(pos, board, occupied):
     """Returns the number of empty squares reachable from pos."""
@@ -25,7 +35,7 @@ def flood_fill_space(pos, board, occupied):
         if (x, y) in visited or (x, y) in occupied:
             continue
         visited.add((x, y))
-        for dx, dy in [d.value for d in Direction]:
+        for dx, dy in _DIRS:
             nx, ny = (x + dx) % w, (y + dy) % h
             if (nx, ny) not in visited and (nx, ny) not in occupied:
                 queue.append((nx, ny))
@@ -87,7 +97,7 @@ def send_move():
         if opp_head:
             opp_next = [((opp_head[0] + odx) % GLOBAL_GAME.board.width,
                          (opp_head[1] + ody) % GLOBAL_GAME.board.height)
-                        for odx, ody in [dd.value for dd in Direction]]
+                        for odx, ody in _DIRS]
             if (nx, ny) in opp_next:
                 continue
         safe_moves.append(d)
@@ -109,8 +119,7 @@ def send_move():
 
     # Use boost if available and space is large
     use_boost = boosts_remaining > 0 and max_space > 10
-    move_str = f"{chosen.name}:BOOST" if use_boost else chosen.name
-    return jsonify({"move": move_str}), 200
+    return app.response_class(_MOVE_BODIES[(chosen, use_boost)], mimetype="application/json")
 
 # ---------------- Boilerplate ----------------
 @app.route("/", methods=["GET"])
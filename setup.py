@@ -0,0 +1,18 @@
+"""
+Optional Cython build of the agent (pure-Python mode, no source changes needed):
+
+    pip install cython setuptools
+    python setup.py build_ext --inplace
+
+This drops compiled agent/sample_agent extension modules next to the sources; anything
+that imports the module (e.g. `waitress-serve --port=5008 agent:app`) then picks up the
+compiled version. `python agent.py` always runs the plain source.
+agent_numba.py is left alone since Numba already compiles its kernels.
+"""
+from setuptools import setup
+from Cython.Build import cythonize
+
+setup(
+    name="case-closed-agent",
+    ext_modules=cythonize(["agent.py", "sample_agent.py"], language_level=3),
+)